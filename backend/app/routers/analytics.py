@@ -41,7 +41,17 @@ async def get_crime_hotspots(
         for i in incidents
     ]
     
-    return hotspots.detect_hotspots(incident_data)
+    results = hotspots.detect_hotspots(incident_data)
+    
+    # detect_hotspots reports positions in incident_data, which depend on
+    # the unordered query above; translate them to incident ids for clients
+    ids = [i["id"] for i in incident_data]
+    for cluster in results.get("clusters", []):
+        cluster["incident_ids"] = [ids[p] for p in cluster.pop("point_indices")]
+    if "noise" in results:
+        results["noise"] = [ids[p] for p in results["noise"]]
+    
+    return results
 
 @router.get("/trends")
 async def get_crime_trends(
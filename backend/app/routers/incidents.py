@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List, Optional
@@ -87,10 +87,13 @@ async def report_crime(
 
 
 @router.get("/localities", response_model=List[str])
-async def get_locality_suggestions(q: str = ""):
+async def get_locality_suggestions(
+    q: str = "",
+    limit: int = Query(10, ge=1, le=50, description="Maximum suggestions (1-50)")
+):
     """Get locality suggestions for autocomplete."""
     from ..utils.geocoder import get_locality_suggestions
-    return get_locality_suggestions(q)
+    return get_locality_suggestions(q, limit)
 
 
 @router.post("/upload_csv", status_code=status.HTTP_201_CREATED)
@@ -102,27 +105,24 @@ async def upload_incidents_csv(
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload a CSV.")
     
-    contents = await file.read()
     try:
-        raw_data = ingestion.parse_csv_data(contents)
         processed_count = 0
         
-        for row in raw_data:
-            incident_data = ingestion.map_csv_to_incident_schema(row)
-            
-            if not all([incident_data['latitude'], incident_data['longitude'], incident_data['incident_time']]):
-                continue
-                
-            try:
-                existing = await db.execute(select(models.CrimeIncident).where(models.CrimeIncident.fir_id == incident_data['fir_id']))
-                if existing.scalars().first():
+        for incidents in ingestion.parse_incident_csv_stream(file):
+            for incident_data in incidents:
+                if not all([incident_data['latitude'], incident_data['longitude'], incident_data['incident_time']]):
+                    continue
+                    
+                try:
+                    existing = await db.execute(select(models.CrimeIncident).where(models.CrimeIncident.fir_id == incident_data['fir_id']))
+                    if existing.scalars().first():
+                        continue
+
+                    db_incident = models.CrimeIncident(**incident_data)
+                    db.add(db_incident)
+                    processed_count += 1
+                except Exception as e:
                     continue
-
-                db_incident = models.CrimeIncident(**incident_data)
-                db.add(db_incident)
-                processed_count += 1
-            except Exception as e:
-                continue
         
         await db.commit()
         return {"message": f"Successfully processed {processed_count} incidents."}
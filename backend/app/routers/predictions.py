@@ -4,6 +4,7 @@ Provides endpoints for crime hotspot predictions using the ML model.
 """
 
 from fastapi import APIRouter, Query
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
 from datetime import datetime, timedelta
 from pydantic import BaseModel
@@ -353,14 +354,20 @@ async def report_crime_for_training(
         # Use the correct relative path to the model
         model_path = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'ml_engine', 'models', 'hotspot_model.joblib')
         
-        predictor = CrimeHotspotPredictor(model_path=model_path)
-        predictor.load_model()
-        predictor.incremental_update({
-            'latitude': latitude,
-            'longitude': longitude,
-            'crime_type': crime_type,
-            'incident_time': incident_time.isoformat()
-        })
+        def update_model():
+            predictor = CrimeHotspotPredictor(model_path=model_path)
+            predictor.load_model()
+            predictor.incremental_update({
+                'latitude': latitude,
+                'longitude': longitude,
+                'crime_type': crime_type,
+                'incident_time': incident_time.isoformat()
+            })
+        
+        # Loading, partial_fit and saving block, and incremental_update waits
+        # on an flock of the model file shared by all worker processes, so
+        # keep it off the event loop
+        await run_in_threadpool(update_model)
         
         return {"status": "received", "message": "Crime report queued for model update"}
     except Exception as e:
@@ -4,8 +4,11 @@ Uses OpenStreetMap's Nominatim API (free, no API key required).
 """
 
 import httpx
-from typing import Optional, Tuple
+import numpy as np
+from typing import List, Optional, Tuple
 import asyncio
+import itertools
+import time
 
 NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
 
@@ -16,6 +19,67 @@ MUMBAI_BOUNDS = {
     "min_lon": 72.77,
     "max_lon": 72.99
 }
+_BOUNDS = (
+    MUMBAI_BOUNDS["min_lat"], MUMBAI_BOUNDS["max_lat"],
+    MUMBAI_BOUNDS["min_lon"], MUMBAI_BOUNDS["max_lon"]
+)
+
+NOMINATIM_HEADERS = {"User-Agent": "SentinelX-CrimeReporting/1.0"}
+
+# Nominatim usage policy allows at most 1 request per second
+NOMINATIM_MIN_INTERVAL = 1.0
+
+
+class _RateLimiter:
+    """
+    Space out calls so that at most one starts every `interval` seconds.
+    Each caller reserves its slot synchronously before sleeping, so no
+    lock (and no binding to a particular event loop) is needed.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_slot = 0.0
+
+    async def wait(self):
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        await asyncio.sleep(slot - now)
+
+
+# Shared by every Nominatim request in the process, so the policy holds
+# across concurrent batches and single lookups alike
+_NOMINATIM_LIMITER = _RateLimiter(NOMINATIM_MIN_INTERVAL)
+
+
+async def _nominatim_search(client: httpx.AsyncClient, query: str) -> Optional[Tuple[float, float]]:
+    """Run a single rate-limited Nominatim search on an existing client."""
+    try:
+        await _NOMINATIM_LIMITER.wait()
+        response = await client.get(
+            NOMINATIM_URL,
+            params={
+                "q": query,
+                "format": "json",
+                "limit": 1,
+                "countrycodes": "in"
+            },
+            headers=NOMINATIM_HEADERS,
+            timeout=10.0
+        )
+        response.raise_for_status()
+        data = response.json()
+        
+        if data and len(data) > 0:
+            lat = float(data[0]["lat"])
+            lon = float(data[0]["lon"])
+            return (lat, lon)
+        return None
+    except Exception as e:
+        print(f"Geocoding error: {e}")
+        return None
+
 
 async def geocode_location(location_name: str, city: str = "Mumbai, India") -> Optional[Tuple[float, float]]:
     """
@@ -25,39 +89,44 @@ async def geocode_location(location_name: str, city: str = "Mumbai, India") -> O
     query = f"{location_name}, {city}"
     
     async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                NOMINATIM_URL,
-                params={
-                    "q": query,
-                    "format": "json",
-                    "limit": 1,
-                    "countrycodes": "in"
-                },
-                headers={
-                    "User-Agent": "SentinelX-CrimeReporting/1.0"
-                },
-                timeout=10.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            if data and len(data) > 0:
-                lat = float(data[0]["lat"])
-                lon = float(data[0]["lon"])
-                return (lat, lon)
-            return None
-        except Exception as e:
-            print(f"Geocoding error: {e}")
-            return None
+        return await _nominatim_search(client, query)
+
+
+async def geocode_many(
+    location_names: List[str],
+    city: str = "Mumbai, India",
+    concurrency: int = 10
+) -> List[Optional[Tuple[float, float]]]:
+    """
+    Geocode several location names over one shared HTTP session.
+    At most `concurrency` requests are in flight, and request starts are
+    throttled to Nominatim's 1 req/s policy. Results keep the input order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async with httpx.AsyncClient() as client:
+        async def geocode_one(name: str) -> Optional[Tuple[float, float]]:
+            async with semaphore:
+                return await _nominatim_search(client, f"{name}, {city}")
+        
+        return await asyncio.gather(*(geocode_one(name) for name in location_names))
 
 
 def is_within_mumbai(lat: float, lon: float) -> bool:
     """Check if coordinates fall within Mumbai's bounding box."""
-    return (
-        MUMBAI_BOUNDS["min_lat"] <= lat <= MUMBAI_BOUNDS["max_lat"] and
-        MUMBAI_BOUNDS["min_lon"] <= lon <= MUMBAI_BOUNDS["max_lon"]
-    )
+    min_lat, max_lat, min_lon, max_lon = _BOUNDS
+    return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+
+
+def is_within_mumbai_vec(lats, lons) -> np.ndarray:
+    """Vectorised is_within_mumbai: boolean mask over coordinate arrays."""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    min_lat, max_lat, min_lon, max_lon = _BOUNDS
+    return np.logical_and.reduce((
+        lats >= min_lat, lats <= max_lat,
+        lons >= min_lon, lons <= max_lon
+    ))
 
 
 # Common Mumbai localities for autocomplete
@@ -74,10 +143,14 @@ MUMBAI_LOCALITIES = [
 ]
 
 
-def get_locality_suggestions(query: str) -> list:
-    """Return matching localities for autocomplete."""
+_LOCALITIES_LOWER = [(loc.lower(), loc) for loc in MUMBAI_LOCALITIES]
+
+
+def get_locality_suggestions(query: str, limit: int = 10) -> list:
+    """Return up to `limit` matching localities for autocomplete."""
     query_lower = query.lower()
-    return [loc for loc in MUMBAI_LOCALITIES if query_lower in loc.lower()]
+    matches = (loc for loc_lower, loc in _LOCALITIES_LOWER if query_lower in loc_lower)
+    return list(itertools.islice(matches, limit))
 
 
 async def reverse_geocode(lat: float, lon: float) -> Optional[str]:
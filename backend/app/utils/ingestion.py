@@ -1,35 +1,105 @@
 import pandas as pd
-from typing import List, Dict
-import io
+from typing import Iterator, List, Dict, Optional
 from fastapi import UploadFile
 
-def parse_csv_data(contents: bytes) -> List[Dict]:
+from .geocoder import is_within_mumbai_vec
+
+# Rows parsed per chunk when streaming an upload
+CSV_CHUNK_SIZE = 10000
+
+# CrimeIncident field -> (candidate CSV columns in priority order, default)
+INCIDENT_COLUMN_ALIASES = {
+    "fir_id": (("fir_id", "id"), ''),
+    "crime_type": (("crime_type", "type"), 'other'),
+    "description": (("description", "desc"), None),
+    "latitude": (("latitude", "lat"), None),
+    "longitude": (("longitude", "lon", "long"), None),
+    "location_name": (("location_name", "address", "location"), None),
+    "incident_time": (("incident_time", "date", "time"), None),
+    "status": (("status",), 'reported'),
+}
+
+# Fields converted to numbers; every other column is read as text so a
+# chunk's type inference cannot change values (e.g. fir_id 104 -> "104.0")
+INCIDENT_NUMERIC_FIELDS = ("latitude", "longitude")
+
+def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Lower-case and snake_case the CSV header in place."""
+    df.columns = [c.lower().strip().replace(' ', '_') for c in df.columns]
+    return df
+
+def build_column_map(columns) -> Dict[str, List[str]]:
     """
-    Parse uploaded CSV content into a list of dictionaries.
-    Assumes CSV has columns fitting our schema or generic ones that need mapping.
+    Resolve which of each field's candidate columns exist in a CSV header.
+    Done once per file so rows can be mapped column-at-a-time.
     """
-    df = pd.read_csv(io.BytesIO(contents))
-    
-    # Basic cleaning
-    df.columns = [c.lower().strip().replace(' ', '_') for c in df.columns]
-    
-    # Fill NaN with None/Null for JSON compatibility
-    df = df.where(pd.notnull(df), None)
-    
-    return df.to_dict(orient='records')
+    present = set(columns)
+    return {
+        field: [col for col in candidates if col in present]
+        for field, (candidates, _) in INCIDENT_COLUMN_ALIASES.items()
+    }
+
+def map_frame_to_incident_schema(df: pd.DataFrame, col_map: Optional[Dict[str, List[str]]] = None) -> List[Dict]:
+    """
+    Map a parsed CSV frame (normalized columns) to CrimeIncident records.
+    Vectorized equivalent of map_csv_to_incident_schema: later candidate
+    columns only fill cells that are empty in earlier ones. Rows whose
+    coordinates fall outside Mumbai are dropped; rows missing coordinates
+    are kept for the caller to reject.
+    """
+    if col_map is None:
+        col_map = build_column_map(df.columns)
+
+    out = {}
+    numeric = {}
+    for field, (_, default) in INCIDENT_COLUMN_ALIASES.items():
+        cols = col_map[field]
+        if not cols:
+            out[field] = default
+            continue
+        values = df[cols[0]]
+        for col in cols[1:]:
+            values = values.fillna(df[col])
+        if field in INCIDENT_NUMERIC_FIELDS:
+            values = pd.to_numeric(values, errors='coerce')
+            numeric[field] = values
+        out[field] = values.astype(object).where(values.notna(), default)
+
+    out = pd.DataFrame(out, index=df.index)
+    if len(numeric) == 2:
+        lats, lons = numeric["latitude"], numeric["longitude"]
+        located = lats.notna() & lons.notna()
+        outside = located & ~is_within_mumbai_vec(lats, lons)
+        out = out[~outside.to_numpy()]
+    out["fir_id"] = out["fir_id"].map(str)
+    return out.to_dict(orient='records')
+
+def parse_incident_csv_stream(upload: UploadFile, chunk_size: int = CSV_CHUNK_SIZE) -> Iterator[List[Dict]]:
+    """
+    Stream an uploaded CSV as chunks of CrimeIncident-shaped records.
+    The header is resolved against INCIDENT_COLUMN_ALIASES once per file,
+    and cells are read as strings so every chunk yields the same types.
+    """
+    upload.file.seek(0)
+    col_map = None
+    for chunk in pd.read_csv(upload.file, chunksize=chunk_size, dtype=str):
+        _normalize_columns(chunk)
+        if col_map is None:
+            col_map = build_column_map(chunk.columns)
+        yield map_frame_to_incident_schema(chunk, col_map)
 
 def map_csv_to_incident_schema(row: Dict) -> Dict:
     """
     Attempt to map CSV columns to CrimeIncident schema.
     This is a helper and might need customization based on actual dataset.
     """
-    return {
-        "fir_id": str(row.get('fir_id') or row.get('id') or ''),
-        "crime_type": row.get('crime_type') or row.get('type') or 'other',
-        "description": row.get('description') or row.get('desc'),
-        "latitude": row.get('latitude') or row.get('lat'),
-        "longitude": row.get('longitude') or row.get('lon') or row.get('long'),
-        "location_name": row.get('location_name') or row.get('address') or row.get('location'),
-        "incident_time": row.get('incident_time') or row.get('date') or row.get('time'),
-        "status": row.get('status') or 'reported'
-    }
+    mapped = {}
+    for field, (candidates, default) in INCIDENT_COLUMN_ALIASES.items():
+        value = None
+        for col in candidates:
+            value = row.get(col)
+            if value:
+                break
+        mapped[field] = value or default
+    mapped["fir_id"] = str(mapped["fir_id"])
+    return mapped
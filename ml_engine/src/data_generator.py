@@ -3,11 +3,13 @@ Mumbai Crime Data Generator
 Generates realistic synthetic crime data for training the prediction model.
 """
 
-import random
 import pandas as pd
 from datetime import datetime, timedelta
 import numpy as np
 
+# Shared NumPy generator so draws can be made in batches instead of per element
+_RNG = np.random.default_rng()
+
 # Mumbai localities with their coordinates and crime profiles
 MUMBAI_LOCALITIES = {
     # South Mumbai (Commercial/Tourist) - Higher theft, lower violent crime
@@ -62,11 +64,52 @@ def get_time_multiplier(crime_type: str, hour: int) -> float:
             return pattern.get(hours[i-1] if i > 0 else hours[-1], 1.0)
     return pattern.get(hours[-1], 1.0)
 
-def add_noise_to_coords(lat: float, lon: float, radius_km: float = 0.5) -> tuple:
-    """Add random noise to coordinates within a radius."""
+def _build_hour_crime_probs(crime_weights: dict) -> tuple:
+    """
+    Crime type probabilities for every hour of the day, as a (24, n_types)
+    array, so the time adjustment and normalization run once per locality.
+    """
+    crime_types = list(crime_weights.keys())
+    weights = np.array(list(crime_weights.values()))
+    multipliers = np.array([
+        [get_time_multiplier(ct, hour) for ct in crime_types] for hour in range(24)
+    ])
+    adjusted = weights * multipliers
+    return crime_types, adjusted / adjusted.sum(axis=1, keepdims=True)
+
+# Per-locality (crime_types, hour x type probabilities), built once
+LOCALITY_HOUR_PROBS = {
+    name: _build_hour_crime_probs(data['crime_weights'])
+    for name, data in MUMBAI_LOCALITIES.items()
+}
+
+# Every crime type any locality can produce, in first-seen order
+CRIME_TYPES = list(dict.fromkeys(
+    ct for types, _ in LOCALITY_HOUR_PROBS.values() for ct in types
+))
+
+def _build_locality_hour_cdf() -> np.ndarray:
+    """
+    Stack LOCALITY_HOUR_PROBS into one (n_localities, 24, n_types) array of
+    cumulative probabilities over CRIME_TYPES, so crime types for a whole
+    batch are drawn with one comparison against uniform samples. Types a
+    locality never produces get zero width.
+    """
+    probs = np.zeros((len(LOCALITY_HOUR_PROBS), 24, len(CRIME_TYPES)))
+    for i, (types, hour_probs) in enumerate(LOCALITY_HOUR_PROBS.values()):
+        probs[i][:, [CRIME_TYPES.index(ct) for ct in types]] = hour_probs
+    cdf = probs.cumsum(axis=2)
+    # Exact 1.0 at the end so a uniform draw in [0, 1) never falls past it
+    return cdf / cdf[:, :, -1:]
+
+LOCALITY_HOUR_CDF = _build_locality_hour_cdf()
+
+def add_noise_to_coords(lat, lon, radius_km: float = 0.5) -> tuple:
+    """Add random noise to coordinates within a radius (scalars or arrays)."""
     # Approximate degrees per km
-    lat_noise = random.gauss(0, radius_km / 111)  # 1 degree lat ≈ 111 km
-    lon_noise = random.gauss(0, radius_km / 85)   # 1 degree lon ≈ 85 km at this latitude
+    size = np.shape(lat) or None
+    lat_noise = _RNG.normal(0.0, radius_km / 111, size)  # 1 degree lat ≈ 111 km
+    lon_noise = _RNG.normal(0.0, radius_km / 85, size)   # 1 degree lon ≈ 85 km at this latitude
     return lat + lat_noise, lon + lon_noise
 
 def generate_crime_data(
@@ -81,7 +124,6 @@ def generate_crime_data(
     if end_date is None:
         end_date = datetime.now()
     
-    records = []
     localities = list(MUMBAI_LOCALITIES.keys())
     
     # Weight localities by crime density (some areas have more crime)
@@ -90,54 +132,50 @@ def generate_crime_data(
         'Bandra East': 1.2, 'Ghatkopar': 1.2, 'Chembur': 1.3,
     }
     
-    for i in range(num_records):
-        # Select locality with weighting
-        if random.random() < 0.4:
-            # 40% chance from high-crime areas
-            locality = random.choice([k for k in locality_weights.keys()])
-        else:
-            locality = random.choice(localities)
-        
-        loc_data = MUMBAI_LOCALITIES[locality]
-        crime_weights = loc_data['crime_weights']
-        
-        # Generate random timestamp
-        time_delta = (end_date - start_date).total_seconds()
-        random_seconds = random.random() * time_delta
-        incident_time = start_date + timedelta(seconds=random_seconds)
-        
-        # Select crime type based on locality weights and time
-        crime_types = list(crime_weights.keys())
-        weights = list(crime_weights.values())
-        
-        # Adjust weights based on time of day
-        hour = incident_time.hour
-        adjusted_weights = []
-        for ct, w in zip(crime_types, weights):
-            multiplier = get_time_multiplier(ct, hour)
-            adjusted_weights.append(w * multiplier)
-        
-        # Normalize weights
-        total = sum(adjusted_weights)
-        adjusted_weights = [w/total for w in adjusted_weights]
-        
-        crime_type = random.choices(crime_types, weights=adjusted_weights, k=1)[0]
-        
-        # Add coordinate noise
-        lat, lon = add_noise_to_coords(loc_data['lat'], loc_data['lon'])
-        
-        records.append({
-            'latitude': round(lat, 6),
-            'longitude': round(lon, 6),
-            'location_name': locality,
-            'crime_type': crime_type,
-            'incident_time': incident_time,
-            'hour': hour,
-            'day_of_week': incident_time.weekday(),
-            'month': incident_time.month,
-        })
+    high_crime_localities = list(locality_weights.keys())
+    
+    # Draw all per-record randomness up front
+    # 40% chance from high-crime areas
+    from_high_crime = _RNG.random(num_records) < 0.4
+    high_crime_picks = _RNG.integers(0, len(high_crime_localities), num_records)
+    any_picks = _RNG.integers(0, len(localities), num_records)
+    time_delta = (end_date - start_date).total_seconds()
+    random_seconds = _RNG.random(num_records) * time_delta
+    lat_noise, lon_noise = add_noise_to_coords(np.zeros(num_records), np.zeros(num_records))
+    
+    # Select locality with weighting
+    chosen = np.where(
+        from_high_crime,
+        np.array(high_crime_localities)[high_crime_picks],
+        np.array(localities)[any_picks]
+    )
+    
+    # Generate random timestamps in one vectorized step
+    incident_times = pd.Timestamp(start_date) + pd.to_timedelta(random_seconds, unit='s').round('us')
+    hours = incident_times.hour
+    
+    loc_idx = pd.Index(localities).get_indexer(chosen)
+    
+    # Select crime type based on locality weights and time of day:
+    # inverse-CDF sampling against each record's (locality, hour) row
+    cdf = LOCALITY_HOUR_CDF[loc_idx, hours.to_numpy()]
+    type_idx = (_RNG.random(num_records)[:, None] > cdf).sum(axis=1)
+    crime_types = np.array(CRIME_TYPES)[type_idx]
+    
+    # Add coordinate noise
+    base_lats = np.array([MUMBAI_LOCALITIES[loc]['lat'] for loc in localities])[loc_idx]
+    base_lons = np.array([MUMBAI_LOCALITIES[loc]['lon'] for loc in localities])[loc_idx]
     
-    df = pd.DataFrame(records)
+    df = pd.DataFrame({
+        'latitude': np.round(base_lats + lat_noise, 6),
+        'longitude': np.round(base_lons + lon_noise, 6),
+        'location_name': chosen,
+        'crime_type': crime_types,
+        'incident_time': incident_times,
+        'hour': hours,
+        'day_of_week': incident_times.weekday,
+        'month': incident_times.month,
+    })
     return df
 
 def save_crime_data(filepath: str = 'data/mumbai_crime_data.csv', num_records: int = 5000):
@@ -137,6 +137,48 @@ def get_hour_weight(hour, crime_type):
     return weight
 
 
+def _build_hour_cdf(crime_type):
+    """Cumulative hour-of-day distribution for inverse-CDF sampling."""
+    weights = np.array([get_hour_weight(h, crime_type) for h in range(24)])
+    cdf = np.cumsum(weights) / weights.sum()
+    cdf[-1] = 1.0  # guard against rounding leaving u > cdf[-1]
+    return cdf
+
+
+# Per-crime-type hour CDF, built once instead of per sample
+HOUR_CDF = {crime_type: _build_hour_cdf(crime_type) for crime_type in CRIME_TYPES}
+
+
+def _hour_cdf(crime_type):
+    """Hour-of-day CDF for a crime type (cached for known types)."""
+    if crime_type not in HOUR_CDF:
+        HOUR_CDF[crime_type] = _build_hour_cdf(crime_type)
+    return HOUR_CDF[crime_type]
+
+
+# Ward attributes as aligned arrays for batched sampling
+_WARD_IDS = np.array(list(MUMBAI_WARDS.keys()))
+_WARD_NAMES = np.array([info["name"] for info in MUMBAI_WARDS.values()])
+_WARD_LATS = np.array([info["lat"] for info in MUMBAI_WARDS.values()])
+_WARD_LNGS = np.array([info["lng"] for info in MUMBAI_WARDS.values()])
+_WARD_RISK = np.array([info["risk_weight"] for info in MUMBAI_WARDS.values()])
+_WARD_PROPORTIONS = _WARD_RISK / _WARD_RISK.sum()
+
+
+def _draw_batch(ward_crimes, crime_type, days_in_month=30):
+    """
+    Draw day, hour and jittered coordinates for every crime of one base row.
+    ward_crimes[i] samples are assigned to the i-th ward.
+    """
+    n = int(ward_crimes.sum())
+    ward_idx = np.repeat(np.arange(len(ward_crimes)), ward_crimes)
+    days = np.random.randint(1, days_in_month + 1, size=n)
+    hours = np.searchsorted(_hour_cdf(crime_type), np.random.random(n), side="right")
+    lats = _WARD_LATS[ward_idx] + np.random.normal(0, 0.005, n)
+    lngs = _WARD_LNGS[ward_idx] + np.random.normal(0, 0.005, n)
+    return ward_idx, days, hours, lats, lngs
+
+
 def generate_training_data(output_path: str):
     """Generate synthetic training data from base statistics."""
     
@@ -144,72 +186,65 @@ def generate_training_data(output_path: str):
     from io import StringIO
     base_df = pd.read_csv(StringIO(BASE_CRIME_DATA))
     
-    all_records = []
-    record_id = 0
+    batches = []
     
     np.random.seed(42)
     
-    for _, row in base_df.iterrows():
-        month_date = parse_month_year(row["Month-Year"])
-        crime_type = row["Crime Type"]
-        total_crimes = int(row["Number"])
+    base_rows = base_df[["Month-Year", "Crime Type", "Number"]].itertuples(index=False, name=None)
+    for month_year, crime_type, number in base_rows:
+        month_date = parse_month_year(month_year)
+        total_crimes = int(number)
         
         # Distribute crimes across wards based on risk weights
-        ward_weights = {w: info["risk_weight"] for w, info in MUMBAI_WARDS.items()}
-        total_weight = sum(ward_weights.values())
+        jitter = np.random.uniform(0.8, 1.2, len(_WARD_IDS))
+        ward_crimes = (total_crimes * _WARD_PROPORTIONS * jitter).astype(int)
+        
+        # Draw every sample for this row in one call per quantity
+        ward_idx, days, hours, lats, lngs = _draw_batch(ward_crimes, crime_type)
+        n = len(ward_idx)
+        
+        timestamps = pd.to_datetime({
+            "year": np.full(n, month_date.year),
+            "month": np.full(n, month_date.month),
+            "day": np.minimum(days, 28),
+            "hour": hours,
+        })
         
-        for ward_id, ward_info in MUMBAI_WARDS.items():
-            # Calculate crimes for this ward
-            ward_proportion = ward_info["risk_weight"] / total_weight
-            ward_crimes = int(total_crimes * ward_proportion * np.random.uniform(0.8, 1.2))
-            
-            if ward_crimes == 0:
-                continue
-            
-            # Distribute across days of month
-            days_in_month = 30
-            
-            for _ in range(ward_crimes):
-                # Random day
-                day = np.random.randint(1, days_in_month + 1)
-                
-                # Hour based on crime type distribution
-                hour_weights = [get_hour_weight(h, crime_type) for h in range(24)]
-                hour_weights = np.array(hour_weights) / sum(hour_weights)
-                hour = np.random.choice(range(24), p=hour_weights)
-                
-                # Create timestamp
-                try:
-                    timestamp = datetime(month_date.year, month_date.month, min(day, 28), hour)
-                except:
-                    timestamp = datetime(month_date.year, month_date.month, 28, hour)
-                
-                # Add some noise to coordinates
-                lat = ward_info["lat"] + np.random.normal(0, 0.005)
-                lng = ward_info["lng"] + np.random.normal(0, 0.005)
-                
-                record = {
-                    "record_id": record_id,
-                    "timestamp": timestamp,
-                    "ward_id": ward_id,
-                    "ward_name": ward_info["name"],
-                    "latitude": lat,
-                    "longitude": lng,
-                    "crime_type": crime_type,
-                    "hour": hour,
-                    "day_of_week": timestamp.weekday(),
-                    "month": timestamp.month,
-                    "year": timestamp.year,
-                    "is_weekend": 1 if timestamp.weekday() >= 5 else 0,
-                    "is_night": 1 if (hour >= 22 or hour <= 5) else 0,
-                    "ward_risk_weight": ward_info["risk_weight"],
-                }
-                
-                all_records.append(record)
-                record_id += 1
+        batches.append(pd.DataFrame({
+            "timestamp": timestamps,
+            "ward_id": _WARD_IDS[ward_idx],
+            "ward_name": _WARD_NAMES[ward_idx],
+            "latitude": lats,
+            "longitude": lngs,
+            "crime_type": crime_type,
+            "hour": hours,
+            "ward_risk_weight": _WARD_RISK[ward_idx],
+        }))
     
     # Create DataFrame
-    df = pd.DataFrame(all_records)
+    df = pd.concat(batches, ignore_index=True)
+    df["record_id"] = np.arange(len(df))
+    df["day_of_week"] = df["timestamp"].dt.weekday
+    df["month"] = df["timestamp"].dt.month
+    df["year"] = df["timestamp"].dt.year
+    df["is_weekend"] = (df["day_of_week"] >= 5).astype("int8")
+    df["is_night"] = ((df["hour"] >= 22) | (df["hour"] <= 5)).astype("int8")
+    df = df[[
+        "record_id", "timestamp", "ward_id", "ward_name", "latitude", "longitude",
+        "crime_type", "hour", "day_of_week", "month", "year",
+        "is_weekend", "is_night", "ward_risk_weight",
+    ]].astype({
+        "record_id": "int32",
+        "latitude": "float32",
+        "longitude": "float32",
+        "hour": "int8",
+        "day_of_week": "int8",
+        "month": "int8",
+        "year": "int16",
+        "is_weekend": "int8",
+        "is_night": "int8",
+        "ward_risk_weight": "float32",
+    })
     
     # Sort by timestamp
     df = df.sort_values("timestamp").reset_index(drop=True)
@@ -5,23 +5,79 @@ Predicts crime hotspots based on location and time features.
 
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor
+from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+from sklearn.linear_model import SGDClassifier, SGDRegressor
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.model_selection import train_test_split
 import joblib
+from joblib import Parallel, delayed
 import os
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from typing import List, Dict, Tuple
 
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# Imported both as ml_engine.src.hotspot_predictor and with ml_engine/src on sys.path
+try:
+    from .ml_common import HOUR_SIN, HOUR_COS, DOW_SIN, DOW_COS
+except ImportError:
+    from ml_common import HOUR_SIN, HOUR_COS, DOW_SIN, DOW_COS
+
+# Risk score based on crime type severity
+SEVERITY_MAP = {
+    'theft': 0.3, 'vandalism': 0.2, 'fraud': 0.3,
+    'burglary': 0.5, 'assault': 0.7, 'robbery': 0.8, 'murder': 1.0
+}
+
+# Serializes model-file updates between threads of this process
+_MODEL_FILE_LOCK = threading.Lock()
+
+@contextmanager
+def _locked_model_file(model_path: str):
+    """
+    Hold an exclusive lock for a read-modify-write of model_path: a thread
+    lock, plus an flock on a sidecar file (where available) so separate
+    worker processes take turns too.
+    """
+    with _MODEL_FILE_LOCK:
+        if not FCNTL_AVAILABLE:
+            yield
+            return
+        os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+        with open(model_path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _fit(model, X, y):
+    """Fit a model and return it (joblib workers return copies)."""
+    return model.fit(X, y)
+
 class CrimeHotspotPredictor:
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, online: bool = False):
+        # online=True trains linear SGD models that incremental_update can
+        # refine with partial_fit; the default tree ensembles need a retrain
+        self.online = online
         self.risk_model = None
         self.crime_type_model = None
-        self.scaler = StandardScaler()
+        # Only the linear online models need standardized inputs; tree
+        # models are scale-invariant and consume raw features
+        self.scaler = StandardScaler() if online else None
         self.label_encoder = LabelEncoder()
         self.model_path = model_path or 'models/hotspot_model.joblib'
         self.is_trained = False
+        # (inode, mtime) of the model file this instance last loaded or saved
+        self._model_stamp = None
         
         # Grid parameters for Mumbai
         self.lat_min, self.lat_max = 18.89, 19.27
@@ -30,23 +86,24 @@ class CrimeHotspotPredictor:
         
     def _create_features(self, df: pd.DataFrame) -> np.ndarray:
         """Create feature matrix from dataframe."""
-        features = []
-        
-        for _, row in df.iterrows():
-            feat = [
-                row['latitude'],
-                row['longitude'],
-                row['hour'],
-                row['day_of_week'],
-                row['month'],
-                np.sin(2 * np.pi * row['hour'] / 24),  # Cyclical hour
-                np.cos(2 * np.pi * row['hour'] / 24),
-                np.sin(2 * np.pi * row['day_of_week'] / 7),  # Cyclical day
-                np.cos(2 * np.pi * row['day_of_week'] / 7),
-            ]
-            features.append(feat)
-        
-        return np.array(features)
+        hour = df['hour'].to_numpy(dtype=np.intp)
+        day_of_week = df['day_of_week'].to_numpy(dtype=np.intp)
+        
+        return np.column_stack([
+            df['latitude'].to_numpy(),
+            df['longitude'].to_numpy(),
+            hour,
+            day_of_week,
+            df['month'].to_numpy(),
+            HOUR_SIN[hour],  # Cyclical hour
+            HOUR_COS[hour],
+            DOW_SIN[day_of_week],  # Cyclical day
+            DOW_COS[day_of_week],
+        ])
+    
+    def _scale(self, X: np.ndarray) -> np.ndarray:
+        """Apply the fitted scaler, if this model uses one."""
+        return self.scaler.transform(X) if self.scaler is not None else X
     
     def train(self, data_path: str = 'data/mumbai_crime_data.csv'):
         """Train the prediction model on crime data."""
@@ -63,37 +120,43 @@ class CrimeHotspotPredictor:
         
         # Create features
         X = self._create_features(df)
-        X_scaled = self.scaler.fit_transform(X)
+        if self.scaler is not None:
+            X = self.scaler.fit_transform(X)
         
         # Encode crime types
         y_crime_type = self.label_encoder.fit_transform(df['crime_type'])
         
         # Create risk score based on crime type severity
-        severity_map = {
-            'theft': 0.3, 'vandalism': 0.2, 'fraud': 0.3,
-            'burglary': 0.5, 'assault': 0.7, 'robbery': 0.8, 'murder': 1.0
-        }
-        df['severity'] = df['crime_type'].map(lambda x: severity_map.get(x, 0.5))
+        df['severity'] = df['crime_type'].map(SEVERITY_MAP).fillna(0.5).astype('float32')
         
         # Train crime type classifier
         X_train, X_test, y_train, y_test = train_test_split(
-            X_scaled, y_crime_type, test_size=0.2, random_state=42
+            X, y_crime_type, test_size=0.2, random_state=42
         )
         
-        self.crime_type_model = RandomForestClassifier(
-            n_estimators=100, max_depth=10, random_state=42, n_jobs=-1
-        )
-        self.crime_type_model.fit(X_train, y_train)
+        if self.online:
+            crime_type_model = SGDClassifier(loss='log_loss', random_state=42)
+            risk_model = SGDRegressor(random_state=42)
+        else:
+            crime_type_model = HistGradientBoostingClassifier(
+                max_iter=200, max_depth=8, learning_rate=0.1,
+                early_stopping=True, random_state=42
+            )
+            risk_model = HistGradientBoostingRegressor(
+                max_iter=200, max_depth=5, learning_rate=0.1,
+                early_stopping=True, random_state=42
+            )
+        
+        # Train crime type classifier and risk level regressor concurrently;
+        # loky caps each worker's inner threads so the two don't oversubscribe
+        self.crime_type_model, self.risk_model = Parallel(n_jobs=2, backend='loky')([
+            delayed(_fit)(crime_type_model, X_train, y_train),
+            delayed(_fit)(risk_model, X, df['severity'].to_numpy()),
+        ])
         
         accuracy = self.crime_type_model.score(X_test, y_test)
         print(f"Crime type prediction accuracy: {accuracy:.2%}")
         
-        # Train risk level regressor
-        self.risk_model = GradientBoostingRegressor(
-            n_estimators=100, max_depth=5, random_state=42
-        )
-        self.risk_model.fit(X_scaled, df['severity'])
-        
         self.is_trained = True
         
         # Save models
@@ -110,19 +173,43 @@ class CrimeHotspotPredictor:
             'crime_type_model': self.crime_type_model,
             'scaler': self.scaler,
             'label_encoder': self.label_encoder,
-            'is_trained': self.is_trained
+            'is_trained': self.is_trained,
+            'online': self.online
         }
-        joblib.dump(model_data, self.model_path)
+        # Dump beside the target and swap it in atomically, so a concurrent
+        # load_model sees either the old or the new file, never a partial one
+        model_dir = os.path.dirname(self.model_path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=model_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                joblib.dump(model_data, f)
+            os.chmod(tmp_path, 0o644)  # mkstemp creates files owner-only
+            os.replace(tmp_path, self.model_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._model_stamp = self._file_stamp()
+    
+    def _file_stamp(self):
+        """Identify the current model file; os.replace gives each save a new inode."""
+        try:
+            st = os.stat(self.model_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns)
     
     def load_model(self):
         """Load trained models from disk."""
         if os.path.exists(self.model_path):
+            stamp = self._file_stamp()
             model_data = joblib.load(self.model_path)
             self.risk_model = model_data['risk_model']
             self.crime_type_model = model_data['crime_type_model']
             self.scaler = model_data['scaler']
             self.label_encoder = model_data['label_encoder']
             self.is_trained = model_data['is_trained']
+            self.online = model_data.get('online', False)
+            self._model_stamp = stamp
             return True
         return False
     
@@ -150,38 +237,53 @@ class CrimeHotspotPredictor:
         lats = np.arange(self.lat_min, self.lat_max, grid_resolution)
         lons = np.arange(self.lon_min, self.lon_max, grid_resolution)
         
-        predictions = []
-        
-        for lat in lats:
-            for lon in lons:
-                features = np.array([[
-                    lat, lon, hour, day_of_week, month,
-                    np.sin(2 * np.pi * hour / 24),
-                    np.cos(2 * np.pi * hour / 24),
-                    np.sin(2 * np.pi * day_of_week / 7),
-                    np.cos(2 * np.pi * day_of_week / 7),
-                ]])
-                
-                features_scaled = self.scaler.transform(features)
-                
-                risk_score = self.risk_model.predict(features_scaled)[0]
-                crime_type_idx = self.crime_type_model.predict(features_scaled)[0]
-                crime_type = self.label_encoder.inverse_transform([crime_type_idx])[0]
-                
-                # Only include cells with significant risk
-                if risk_score > 0.3:
-                    predictions.append({
-                        'latitude': float(lat),
-                        'longitude': float(lon),
-                        'risk_score': float(risk_score),
-                        'predicted_crime_type': crime_type,
-                        'risk_level': self._score_to_level(risk_score),
-                        'time': target_time.isoformat()
-                    })
-        
-        # Sort by risk score and return top hotspots
-        predictions.sort(key=lambda x: x['risk_score'], reverse=True)
-        return predictions[:50]  # Top 50 hotspots
+        lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+        lat_flat = lat_grid.ravel()
+        lon_flat = lon_grid.ravel()
+        
+        # Fill one preallocated matrix: the time columns are the same for
+        # every cell, so they are broadcast from a single row
+        features = np.empty((lat_flat.size, 9))
+        features[:, 0] = lat_flat
+        features[:, 1] = lon_flat
+        features[:, 2:] = [
+            hour, day_of_week, month,
+            HOUR_SIN[hour], HOUR_COS[hour],
+            DOW_SIN[day_of_week], DOW_COS[day_of_week],
+        ]
+        
+        # Score the whole grid in one call per model
+        features = self._scale(features)
+        risk_scores = self.risk_model.predict(features)
+        crime_type_idx = self.crime_type_model.predict(features)
+        
+        # Only include cells with significant risk
+        candidates = np.flatnonzero(risk_scores > 0.3)
+        
+        # Select the top 50 hotspots in O(N) with a partition, then sort
+        # only those; ties at the cutoff are kept in grid order
+        top_n = 50
+        if len(candidates) > top_n:
+            scores = risk_scores[candidates]
+            cutoff = -np.partition(-scores, top_n - 1)[top_n - 1]
+            above = candidates[scores > cutoff]
+            ties = candidates[scores == cutoff][:top_n - len(above)]
+            candidates = np.sort(np.concatenate([above, ties]))
+        order = np.argsort(-risk_scores[candidates], kind='stable')
+        top = candidates[order]
+        crime_types = self.label_encoder.inverse_transform(crime_type_idx[top])
+        
+        return [
+            {
+                'latitude': float(lat_flat[i]),
+                'longitude': float(lon_flat[i]),
+                'risk_score': float(risk_scores[i]),
+                'predicted_crime_type': crime_type,
+                'risk_level': self._score_to_level(risk_scores[i]),
+                'time': target_time.isoformat()
+            }
+            for i, crime_type in zip(top, crime_types)
+        ]
     
     def _score_to_level(self, score: float) -> str:
         """Convert numeric score to risk level."""
@@ -194,16 +296,45 @@ class CrimeHotspotPredictor:
         else:
             return 'low'
     
-    def incremental_update(self, new_crime: Dict):
+    def incremental_update(self, new_crime: Dict) -> bool:
         """
         Update model with new crime report (online learning).
-        This is a simplified version - in production, you'd use proper online learning.
+        Only models trained with online=True are refined in place via
+        partial_fit; tree ensembles keep the report for the next retrain.
+        Returns True if the model was updated and saved. Blocks on file
+        I/O and the model-file lock, so async callers should run it in a
+        worker thread.
         """
-        # For now, just log that we received new data
-        # Full implementation would use partial_fit or retrain periodically
-        print(f"Received new crime report: {new_crime}")
-        # TODO: Implement proper online learning with SGDClassifier
-
+        if not self.online or not self.is_trained:
+            print(f"Received new crime report: {new_crime}")
+            return False
+        
+        incident_time = pd.to_datetime(new_crime['incident_time'])
+        row = pd.DataFrame([{
+            'latitude': new_crime['latitude'],
+            'longitude': new_crime['longitude'],
+            'hour': incident_time.hour,
+            'day_of_week': incident_time.weekday(),
+            'month': incident_time.month,
+        }])
+        crime_type = new_crime.get('crime_type')
+        
+        # Under the lock, re-read the file only if another writer replaced it
+        # since this instance loaded it, so concurrent reports build on each
+        # other's updates instead of overwriting them
+        with _locked_model_file(self.model_path):
+            if self._file_stamp() != self._model_stamp:
+                self.load_model()
+            features = self._scale(self._create_features(row))
+            self.risk_model.partial_fit(features, [SEVERITY_MAP.get(crime_type, 0.5)])
+            
+            # The classifier's label set is fixed at training time
+            if crime_type in self.label_encoder.classes_:
+                label = self.label_encoder.transform([crime_type])
+                self.crime_type_model.partial_fit(features, label)
+            
+            self.save_model()
+        return True
 
 if __name__ == '__main__':
     from data_generator import save_crime_data
@@ -3,56 +3,116 @@ import numpy as np
 from sklearn.cluster import DBSCAN
 from typing import List, Dict
 
+try:
+    import h3
+    H3_AVAILABLE = True
+except ImportError:
+    H3_AVAILABLE = False
+
+EARTH_RADIUS_METERS = 6371000.0
+
+def _valid_coords(df: pd.DataFrame):
+    """Return (positions, coords) for rows with both latitude and longitude."""
+    valid = df[['latitude', 'longitude']].notna().all(axis=1).to_numpy()
+    return np.flatnonzero(valid), df.loc[valid, ['latitude', 'longitude']].to_numpy(dtype=float)
+
+def _format_clusters(labels: np.ndarray, coords: np.ndarray, positions: np.ndarray) -> Dict:
+    """Group points by cluster label (-1 = noise) into the hotspot payload."""
+    clustered = labels != -1
+    
+    # Format results
+    results = {
+        "clusters": [],
+        "noise": positions[~clustered].tolist()
+    }
+    
+    if not clustered.any():
+        return results
+    
+    # One groupby over clustered points replaces per-cluster masking
+    cluster_labels = labels[clustered]
+    points = pd.DataFrame(coords[clustered], columns=['latitude', 'longitude'])
+    centroids = points.groupby(cluster_labels).mean()
+    members = pd.Series(positions[clustered]).groupby(cluster_labels).agg(list)
+    
+    for label, lat, lon, indices in zip(
+        centroids.index, centroids['latitude'], centroids['longitude'], members
+    ):
+        results["clusters"].append({
+            "cluster_id": int(label),
+            "centroid": {"latitude": float(lat), "longitude": float(lon)},
+            "incident_count": len(indices),
+            "point_indices": indices
+        })
+    
+    return results
+
 def detect_hotspots(incidents: List[Dict], epsilon_meters: float = 500, min_samples: int = 5) -> Dict:
     """
     Detect crime hotspots using DBSCAN clustering.
-    eps is converted to degrees roughly (approx 1 degree = 111km).
+    Distances are great-circle (haversine) on radian coordinates, so
+    epsilon_meters is exact at any latitude.
+    Clusters carry their centroid, size and the indices of their member
+    incidents in the input list; "noise" lists the indices of unclustered
+    incidents. Callers index back into `incidents` when they need records.
     """
     if not incidents:
         return {"clusters": [], "noise": []}
-
+    
     df = pd.DataFrame(incidents)
     
     # Simple validation
     if 'latitude' not in df.columns or 'longitude' not in df.columns:
         return {"error": "Missing lat/lon data"}
-        
-    coords = df[['latitude', 'longitude']].dropna().to_numpy()
+    
+    positions, coords = _valid_coords(df)
     
     if len(coords) == 0:
         return {"clusters": [], "noise": []}
-
-    # Approx conversion: 1 degree ~= 111,000 meters
-    # eps in degrees = epsilon_meters / 111000
-    eps_degrees = epsilon_meters / 111000.0
+    
+    # Haversine works on the unit sphere: eps in radians = meters / earth radius
+    eps_radians = epsilon_meters / EARTH_RADIUS_METERS
     
     # DBSCAN
-    db = DBSCAN(eps=eps_degrees, min_samples=min_samples, metric='euclidean', algorithm='auto').fit(coords)
+    db = DBSCAN(eps=eps_radians, min_samples=min_samples, metric='haversine', algorithm='ball_tree').fit(np.radians(coords))
     
-    df['cluster'] = db.labels_
+    return _format_clusters(db.labels_, coords, positions)
+
+def detect_hotspots_h3(incidents: List[Dict], resolution: int = 9, min_samples: int = 5) -> Dict:
+    """
+    Detect crime hotspots by binning incidents into H3 hexagons.
+    Each hex holding at least min_samples incidents becomes a cluster
+    (resolution 9 ~ 170m edge); the payload matches detect_hotspots plus
+    the cell id and its boundary. Falls back to DBSCAN if h3 is missing.
+    """
+    if not H3_AVAILABLE:
+        return detect_hotspots(incidents, min_samples=min_samples)
     
-    # Format results
-    results = {
-        "clusters": [],
-        "noise": df[df['cluster'] == -1].to_dict(orient='records')
-    }
+    if not incidents:
+        return {"clusters": [], "noise": []}
+    
+    df = pd.DataFrame(incidents)
+    
+    # Simple validation
+    if 'latitude' not in df.columns or 'longitude' not in df.columns:
+        return {"error": "Missing lat/lon data"}
+    
+    positions, coords = _valid_coords(df)
+    
+    if len(coords) == 0:
+        return {"clusters": [], "noise": []}
+    
+    cells = [h3.latlng_to_cell(lat, lon, resolution) for lat, lon in coords.tolist()]
+    labels, cell_ids = pd.factorize(pd.Series(cells))
+    
+    # Hexes below the density threshold count as noise
+    counts = np.bincount(labels)
+    labels = np.where(counts[labels] >= min_samples, labels, -1)
+    
+    results = _format_clusters(labels, coords, positions)
+    for cluster in results["clusters"]:
+        cell = cell_ids[cluster["cluster_id"]]
+        cluster["h3_cell"] = cell
+        cluster["boundary"] = [list(point) for point in h3.cell_to_boundary(cell)]
     
-    # Group by cluster
-    unique_clusters = set(db.labels_)
-    if -1 in unique_clusters:
-        unique_clusters.remove(-1)
-        
-    for label in unique_clusters:
-        cluster_points = df[df['cluster'] == label]
-        centroid = {
-            "latitude": cluster_points['latitude'].mean(),
-            "longitude": cluster_points['longitude'].mean()
-        }
-        results["clusters"].append({
-            "cluster_id": int(label),
-            "centroid": centroid,
-            "incident_count": len(cluster_points),
-            "points": cluster_points.to_dict(orient='records')
-        })
-        
     return results
@@ -0,0 +1,31 @@
+"""
+Shared settings and lookup tables for the SentinelX ML modules.
+Kept in one place so the training scripts and the online predictor
+encode features and size their thread pools the same way.
+"""
+
+import os
+import numpy as np
+
+# Arrow's multithreaded CSV reader is used when pyarrow is installed
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    CSV_ENGINE = 'c'
+
+# Leave one core free for the OS/IO; tune per host if needed
+N_JOBS = max(1, (os.cpu_count() or 2) - 1)
+
+# LightGBM histogram settings. Coarser histograms: 63 bins fit small cells
+# and make sibling-subtraction cheaper on this low-cardinality data
+LGBM_HISTOGRAM_PARAMS = {'max_bin': 63, 'min_child_samples': 50}
+
+# Cyclical encodings: hour, weekday and month take few values, so look them
+# up instead of evaluating sin/cos per row (month tables are indexed 1-12)
+_HOUR_ANGLES = 2 * np.pi * np.arange(24) / 24
+_DOW_ANGLES = 2 * np.pi * np.arange(7) / 7
+_MONTH_ANGLES = 2 * np.pi * np.arange(13) / 12
+HOUR_SIN, HOUR_COS = np.sin(_HOUR_ANGLES), np.cos(_HOUR_ANGLES)
+DOW_SIN, DOW_COS = np.sin(_DOW_ANGLES), np.cos(_DOW_ANGLES)
+MONTH_SIN, MONTH_COS = np.sin(_MONTH_ANGLES), np.cos(_MONTH_ANGLES)
@@ -21,12 +21,10 @@ def predict_trends(incidents: List[Dict]) -> Dict:
     # Future "prediction" (simplistic: linear extrapolation or just returning recent trend)
     # For MVP, we return the historical trend used for charting
     
-    trend_data = []
-    for date, count in daily_counts.items():
-        trend_data.append({
-            "date": date.strftime("%Y-%m-%d"),
-            "count": int(count),
-            "moving_avg": float(moving_avg.get(date, 0))
-        })
+    trend_data = pd.DataFrame({
+        "date": daily_counts.index.strftime("%Y-%m-%d"),
+        "count": daily_counts.to_numpy(dtype=int),
+        "moving_avg": moving_avg.to_numpy(dtype=float)
+    })
         
-    return {"daily_trends": trend_data}
+    return {"daily_trends": trend_data.to_dict(orient='records')}
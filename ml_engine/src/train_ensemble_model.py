@@ -11,11 +11,18 @@ import pandas as pd
 import numpy as np
 import joblib
 import os
+import pickle
 from datetime import datetime
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.model_selection import train_test_split, cross_val_predict
+from sklearn.preprocessing import LabelEncoder
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, roc_auc_score, accuracy_score
+
+from ml_common import (
+    CSV_ENGINE, N_JOBS, LGBM_HISTOGRAM_PARAMS,
+    HOUR_SIN, HOUR_COS, DOW_SIN, DOW_COS, MONTH_SIN, MONTH_COS
+)
+
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -34,6 +41,15 @@ except ImportError:
     HAS_XGBOOST = False
     print("Warning: XGBoost not installed. Installing...")
 
+# joblib compresses with lz4 when the codec is installed, else zlib
+try:
+    import lz4  # noqa: F401
+    HAS_LZ4 = True
+except ImportError:
+    HAS_LZ4 = False
+
+MODEL_COMPRESSION = ('lz4', 3) if HAS_LZ4 else ('zlib', 3)
+
 
 # Mumbai location mapping for feature engineering
 LOCATION_RISK_WEIGHTS = {
@@ -44,12 +60,77 @@ LOCATION_RISK_WEIGHTS = {
     'Marine Drive': 0.5, 'Churchgate': 0.6, 'Sion': 0.9, 'Juhu': 0.7
 }
 
+# XGBoost's histogram builder stops scaling past ~8 threads, so it is
+# capped there; tune per host if needed
+XGB_N_JOBS = min(N_JOBS, 8)
+
+# Folds used for out-of-fold base predictions, which both train the
+# meta-learner and provide the reported metrics
+STACKING_FOLDS = 5
+
+# Explicit training CSV dtypes: no inference pass, and the label columns
+# arrive as categoricals. Coordinates stay float64 so lat/lon_grid
+# truncate exactly as before
+CSV_DTYPES = {
+    'latitude': 'float64', 'longitude': 'float64',
+    'hour': 'int8', 'day_of_week': 'int8', 'month': 'int8',
+    'location_name': 'category', 'crime_type': 'category'
+}
+
+# Model input layout, in column order; ensembles saved with any other
+# layout must be retrained
+FEATURE_COLUMNS = [
+    'latitude', 'longitude', 'hour', 'day_of_week', 'month',
+    'location_encoded', 'location_risk', 'crime_encoded', 'crime_severity',
+    'hour_sin', 'hour_cos', 'day_sin', 'day_cos', 'month_sin', 'month_cos',
+    'is_weekend', 'is_night', 'is_evening', 'is_rush_hour',
+    'lat_grid', 'lon_grid',
+    'risk_time_interaction'
+]
+
+# Label-encoded columns passed to LightGBM as categorical features
+CATEGORICAL_FEATURES = ['location_encoded', 'crime_encoded']
+
 CRIME_SEVERITY = {
     'theft': 0.6, 'assault': 0.8, 'robbery': 0.9, 'burglary': 0.7,
     'vandalism': 0.4, 'fraud': 0.5, 'murder': 1.0, 'molestation': 0.85,
     'rape': 0.95, 'riots': 0.9
 }
 
+# Synthetic hotspot label: weighted risk score over these columns
+RISK_SCORE_COLUMNS = ['location_risk', 'crime_severity', 'is_night', 'is_evening', 'is_weekend']
+RISK_SCORE_WEIGHTS = np.array([0.4, 0.3, 0.15, 0.1, 0.05])
+
+
+
+def _derive_features(hour, day, month, latitude, longitude, location_risk, crime_severity):
+    """
+    Compute the ensemble's derived numeric features from raw arrays.
+    Returns (features, is_hotspot): a dict of column name -> array and the
+    synthetic int8 label. Pure NumPy, so no per-column DataFrame inserts.
+    """
+    features = {
+        # Time-based features
+        'hour_sin': HOUR_SIN[hour], 'hour_cos': HOUR_COS[hour],
+        'day_sin': DOW_SIN[day], 'day_cos': DOW_COS[day],
+        'month_sin': MONTH_SIN[month], 'month_cos': MONTH_COS[month],
+        # Flags: bools reinterpret as int8 for free
+        'is_weekend': (day >= 5).view(np.int8),
+        'is_night': ((hour >= 22) | (hour <= 5)).view(np.int8),
+        'is_evening': ((hour >= 18) & (hour <= 21)).view(np.int8),
+        'is_rush_hour': (((hour >= 8) & (hour <= 10)) |
+                         ((hour >= 17) & (hour <= 19))).view(np.int8),
+        # Spatial grid features (for clustering patterns)
+        'lat_grid': (latitude * 100).astype(int),
+        'lon_grid': (longitude * 100).astype(int),
+    }
+    # Interaction features
+    features['risk_time_interaction'] = location_risk * features['is_night']
+    
+    columns = {'location_risk': location_risk, 'crime_severity': crime_severity, **features}
+    risk_score = np.column_stack([columns[c] for c in RISK_SCORE_COLUMNS]) @ RISK_SCORE_WEIGHTS
+    return features, (risk_score >= 0.6).astype(np.int8)
+
 
 class EnsembleHotspotPredictor:
     """
@@ -60,80 +141,94 @@ class EnsembleHotspotPredictor:
         self.lgb_model = None
         self.xgb_model = None
         self.meta_learner = None
+        # Native boosters used for inference; loading from the native model
+        # files skips unpickling and the sklearn wrappers' input checks
+        self._lgb_booster = None
+        self._xgb_booster = None
         self.location_encoder = LabelEncoder()
         self.crime_encoder = LabelEncoder()
-        self.scaler = StandardScaler()
         self.is_trained = False
         self.feature_names = None
         
-    def prepare_features(self, df: pd.DataFrame) -> tuple:
-        """Prepare features for training/prediction."""
+    @staticmethod
+    def _fill_label(values: pd.Series, fill: str) -> pd.Series:
+        """fillna that also works on categorical columns."""
+        if isinstance(values.dtype, pd.CategoricalDtype) and values.hasnans and fill not in values.cat.categories:
+            values = values.cat.add_categories([fill])
+        return values.fillna(fill)
+    
+    @staticmethod
+    def _encode(encoder: LabelEncoder, values: pd.Series, fit: bool) -> np.ndarray:
+        """
+        Label-encode values with one hash lookup per row. Fitting only
+        learns the sorted classes (from the distinct values, so categorical
+        columns never expand to per-row strings); codes always come from
+        those classes, so values unseen at fit time map to -1.
+        """
+        if fit:
+            encoder.fit(np.asarray(pd.unique(values), dtype=object))
+        return pd.Categorical(values, categories=encoder.classes_).codes.astype(np.int32)
+    
+    def prepare_features(self, df: pd.DataFrame, fit: bool = None) -> tuple:
+        """
+        Prepare features for training/prediction.
+        The encoders are fitted only when fit is True (by default, until the
+        model is trained or loaded), so a loaded model keeps the ids it was
+        trained with.
+        """
         df = df.copy()
+        if fit is None:
+            fit = not self.is_trained
         
         # Encode location names
         if 'location_name' in df.columns:
-            df['location_encoded'] = self.location_encoder.fit_transform(df['location_name'].fillna('Unknown'))
-            df['location_risk'] = df['location_name'].map(LOCATION_RISK_WEIGHTS).fillna(1.0)
+            names = self._fill_label(df['location_name'], 'Unknown')
+            df['location_encoded'] = self._encode(self.location_encoder, names, fit)
+            # Weight each distinct name once; names unseen at fit time still
+            # get their own weight
+            locs = pd.Categorical(names)
+            risk = locs.categories.map(LOCATION_RISK_WEIGHTS).fillna(1.0)
+            df['location_risk'] = risk.to_numpy(dtype=float)[locs.codes]
         else:
             df['location_encoded'] = 0
             df['location_risk'] = 1.0
             
         # Encode crime types
         if 'crime_type' in df.columns:
-            df['crime_encoded'] = self.crime_encoder.fit_transform(df['crime_type'].fillna('other'))
-            df['crime_severity'] = df['crime_type'].str.lower().map(CRIME_SEVERITY).fillna(0.5)
+            df['crime_encoded'] = self._encode(self.crime_encoder, self._fill_label(df['crime_type'], 'other'), fit)
+            # Lower-case and look up each distinct crime type once, then
+            # gather by code (missing values take the trailing 0.5 default)
+            crimes = pd.Categorical(df['crime_type'])
+            severity = crimes.categories.str.lower().map(CRIME_SEVERITY).fillna(0.5)
+            df['crime_severity'] = np.append(severity.to_numpy(dtype=float), 0.5)[crimes.codes]
         else:
             df['crime_encoded'] = 0
             df['crime_severity'] = 0.5
         
-        # Time-based features
-        df['hour_sin'] = np.sin(2 * np.pi * df['hour'] / 24)
-        df['hour_cos'] = np.cos(2 * np.pi * df['hour'] / 24)
-        df['day_sin'] = np.sin(2 * np.pi * df['day_of_week'] / 7)
-        df['day_cos'] = np.cos(2 * np.pi * df['day_of_week'] / 7)
-        df['month_sin'] = np.sin(2 * np.pi * df['month'] / 12)
-        df['month_cos'] = np.cos(2 * np.pi * df['month'] / 12)
-        
-        # Is weekend
-        df['is_weekend'] = (df['day_of_week'] >= 5).astype(int)
-        
-        # Time of day categories
-        df['is_night'] = ((df['hour'] >= 22) | (df['hour'] <= 5)).astype(int)
-        df['is_evening'] = ((df['hour'] >= 18) & (df['hour'] <= 21)).astype(int)
-        df['is_rush_hour'] = (((df['hour'] >= 8) & (df['hour'] <= 10)) | 
-                              ((df['hour'] >= 17) & (df['hour'] <= 19))).astype(int)
-        
-        # Spatial grid features (for clustering patterns)
-        df['lat_grid'] = (df['latitude'] * 100).astype(int)
-        df['lon_grid'] = (df['longitude'] * 100).astype(int)
-        df['spatial_hash'] = df['lat_grid'] * 1000 + df['lon_grid']
-        
-        # Interaction features
-        df['location_time_interaction'] = df['location_encoded'] * df['hour']
-        df['risk_time_interaction'] = df['location_risk'] * df['is_night']
+        # Numeric features come from one array kernel, joined in one step
+        features, label = _derive_features(
+            df['hour'].to_numpy(dtype=np.intp),
+            df['day_of_week'].to_numpy(dtype=np.intp),
+            df['month'].to_numpy(dtype=np.intp),
+            df['latitude'].to_numpy(dtype=float),
+            df['longitude'].to_numpy(dtype=float),
+            df['location_risk'].to_numpy(dtype=float),
+            df['crime_severity'].to_numpy(dtype=float),
+        )
+        df = pd.concat([df, pd.DataFrame(features, index=df.index)], axis=1)
         
         # Create target: is this a high-risk hotspot?
         # Based on location risk, time of day, and crime severity
-        risk_score = (df['location_risk'] * 0.4 + 
-                     df['crime_severity'] * 0.3 +
-                     df['is_night'] * 0.15 +
-                     df['is_evening'] * 0.1 +
-                     df['is_weekend'] * 0.05)
-        df['is_hotspot'] = (risk_score >= 0.6).astype(int)
-        
-        # Feature columns
-        feature_cols = [
-            'latitude', 'longitude', 'hour', 'day_of_week', 'month',
-            'location_encoded', 'location_risk', 'crime_encoded', 'crime_severity',
-            'hour_sin', 'hour_cos', 'day_sin', 'day_cos', 'month_sin', 'month_cos',
-            'is_weekend', 'is_night', 'is_evening', 'is_rush_hour',
-            'lat_grid', 'lon_grid', 'spatial_hash',
-            'location_time_interaction', 'risk_time_interaction'
-        ]
-        
-        self.feature_names = feature_cols
-        X = df[feature_cols].values
-        y = df['is_hotspot'].values
+        df['is_hotspot'] = label
+        
+        self.feature_names = list(FEATURE_COLUMNS)
+        # Cast each source column straight into a preallocated float32,
+        # column-major matrix instead of upcasting a mixed-dtype frame;
+        # float32 halves it and both boosters bin it without upcasting
+        X = np.empty((len(df), len(FEATURE_COLUMNS)), dtype=np.float32, order='F')
+        for j, col in enumerate(FEATURE_COLUMNS):
+            X[:, j] = features[col] if col in features else df[col].to_numpy()
+        y = label
         
         return X, y, df
     
@@ -145,23 +240,19 @@ class EnsembleHotspotPredictor:
         
         # Load data
         print(f"\n📂 Loading data from: {data_path}")
-        df = pd.read_csv(data_path)
+        df = pd.read_csv(data_path, engine=CSV_ENGINE, dtype=CSV_DTYPES)
         print(f"   Loaded {len(df)} crime records")
         
         # Prepare features
         print("\n🔧 Preparing features...")
-        X, y, df_processed = self.prepare_features(df)
+        X, y, df_processed = self.prepare_features(df, fit=True)
         print(f"   Feature matrix shape: {X.shape}")
         print(f"   Target distribution: {np.bincount(y)}")
         
-        # Scale features
-        X_scaled = self.scaler.fit_transform(X)
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X_scaled, y, test_size=0.2, random_state=42, stratify=y
-        )
-        print(f"\n📊 Train/Test split: {len(X_train)}/{len(X_test)}")
+        # No holdout: every row is scored out-of-fold once, and the
+        # deployed models are refit on all of them
+        folds = StratifiedKFold(n_splits=STACKING_FOLDS, shuffle=True, random_state=42)
+        print(f"\n📊 Stratified {STACKING_FOLDS}-fold out-of-fold evaluation on {len(X)} rows")
         
         # === Train LightGBM ===
         print("\n🌲 Training LightGBM model...")
@@ -174,18 +265,29 @@ class EnsembleHotspotPredictor:
             'feature_fraction': 0.8,
             'bagging_fraction': 0.8,
             'bagging_freq': 5,
+            **LGBM_HISTOGRAM_PARAMS,
             'verbose': -1,
             'n_estimators': 200,
+            'n_jobs': N_JOBS,
             'random_state': 42
         }
         
         self.lgb_model = lgb.LGBMClassifier(**lgb_params)
-        self.lgb_model.fit(X_train, y_train)
-        
-        lgb_train_pred = self.lgb_model.predict_proba(X_train)[:, 1]
-        lgb_test_pred = self.lgb_model.predict_proba(X_test)[:, 1]
-        lgb_auc = roc_auc_score(y_test, lgb_test_pred)
-        print(f"   LightGBM Test AUC: {lgb_auc:.4f}")
+        # Encoded ids are labels, not ordinals: let LightGBM split them as categories
+        categorical = [self.feature_names.index(c) for c in CATEGORICAL_FEATURES]
+        
+        # Out-of-fold predictions feed the meta-learner, so it never sees
+        # scores from a model that was fit on the same rows; n_jobs=1 keeps
+        # the folds from nesting parallelism over LightGBM's own threads
+        lgb_oof_pred = cross_val_predict(
+            self.lgb_model, X, y, cv=folds,
+            method='predict_proba', n_jobs=1,
+            params={'categorical_feature': categorical}
+        )[:, 1]
+        self.lgb_model.fit(X, y, categorical_feature=categorical)
+        
+        lgb_auc = roc_auc_score(y, lgb_oof_pred)
+        print(f"   LightGBM OOF AUC: {lgb_auc:.4f}")
         
         # === Train XGBoost ===
         print("\n🚀 Training XGBoost model...")
@@ -199,36 +301,43 @@ class EnsembleHotspotPredictor:
             'colsample_bytree': 0.8,
             'random_state': 42,
             'use_label_encoder': False,
+            'n_jobs': XGB_N_JOBS,
             'verbosity': 0
         }
         
         self.xgb_model = xgb.XGBClassifier(**xgb_params)
-        self.xgb_model.fit(X_train, y_train)
+        xgb_oof_pred = cross_val_predict(
+            self.xgb_model, X, y, cv=folds,
+            method='predict_proba', n_jobs=1
+        )[:, 1]
+        self.xgb_model.fit(X, y)
         
-        xgb_train_pred = self.xgb_model.predict_proba(X_train)[:, 1]
-        xgb_test_pred = self.xgb_model.predict_proba(X_test)[:, 1]
-        xgb_auc = roc_auc_score(y_test, xgb_test_pred)
-        print(f"   XGBoost Test AUC: {xgb_auc:.4f}")
+        xgb_auc = roc_auc_score(y, xgb_oof_pred)
+        print(f"   XGBoost OOF AUC: {xgb_auc:.4f}")
         
         # === Train LR Meta-Learner (Stacking) ===
         print("\n📈 Training Logistic Regression meta-learner...")
         
-        # Create meta-features from base model predictions
-        meta_train = np.column_stack([lgb_train_pred, xgb_train_pred])
-        meta_test = np.column_stack([lgb_test_pred, xgb_test_pred])
+        # Create meta-features from out-of-fold base model predictions
+        meta_features = np.column_stack([lgb_oof_pred, xgb_oof_pred])
         
+        # Two inputs give a 3x3 Hessian: Newton steps converge in a handful
+        # of iterations where lbfgs approximates curvature from gradients
         self.meta_learner = LogisticRegression(
             C=1.0, 
-            solver='lbfgs',
-            max_iter=500,
+            solver='newton-cholesky',
+            max_iter=50,
             random_state=42
         )
-        self.meta_learner.fit(meta_train, y_train)
         
-        # Final ensemble predictions
-        ensemble_pred = self.meta_learner.predict_proba(meta_test)[:, 1]
-        ensemble_auc = roc_auc_score(y_test, ensemble_pred)
-        ensemble_acc = accuracy_score(y_test, (ensemble_pred >= 0.5).astype(int))
+        # Score the meta-learner out-of-fold on the same splits, then fit it
+        # on all rows for deployment
+        ensemble_pred = cross_val_predict(
+            self.meta_learner, meta_features, y, cv=folds, method='predict_proba'
+        )[:, 1]
+        self.meta_learner.fit(meta_features, y)
+        ensemble_auc = roc_auc_score(y, ensemble_pred)
+        ensemble_acc = accuracy_score(y, (ensemble_pred >= 0.5).astype(int))
         
         print(f"\n" + "="*60)
         print("📊 ENSEMBLE MODEL PERFORMANCE")
@@ -242,7 +351,7 @@ class EnsembleHotspotPredictor:
         # Classification report
         print("\n📋 Classification Report:")
         y_pred = (ensemble_pred >= 0.5).astype(int)
-        print(classification_report(y_test, y_pred, target_names=['Low Risk', 'High Risk']))
+        print(classification_report(y, y_pred, target_names=['Low Risk', 'High Risk']))
         
         # Feature importance (from LightGBM)
         print("\n🎯 Top 10 Important Features (LightGBM):")
@@ -250,31 +359,29 @@ class EnsembleHotspotPredictor:
             'feature': self.feature_names,
             'importance': self.lgb_model.feature_importances_
         }).sort_values('importance', ascending=False)
-        for _, row in importance.head(10).iterrows():
-            print(f"   {row['feature']}: {row['importance']:.4f}")
+        for feature, imp in importance.head(10).itertuples(index=False, name=None):
+            print(f"   {feature}: {imp:.4f}")
         
         # === Save Models ===
         print("\n💾 Saving models...")
         os.makedirs(model_save_dir, exist_ok=True)
         
-        # Save individual models
-        lgb_path = os.path.join(model_save_dir, 'lightgbm_model.pkl')
-        xgb_path = os.path.join(model_save_dir, 'xgboost_model.pkl')
-        meta_path = os.path.join(model_save_dir, 'meta_learner.pkl')
+        # Boosters go to their native formats; the bundle references them
+        lgb_path = os.path.join(model_save_dir, 'lightgbm_model.txt')
+        xgb_path = os.path.join(model_save_dir, 'xgboost_model.json')
         ensemble_path = os.path.join(model_save_dir, 'ensemble_model.pkl')
         
-        joblib.dump(self.lgb_model, lgb_path)
-        joblib.dump(self.xgb_model, xgb_path)
-        joblib.dump(self.meta_learner, meta_path)
+        self.lgb_model.booster_.save_model(lgb_path)
+        self.xgb_model.save_model(xgb_path)
+        self._lgb_booster = self.lgb_model.booster_
+        self._xgb_booster = self.xgb_model.get_booster()
         
-        # Save complete ensemble
         ensemble_data = {
-            'lgb_model': self.lgb_model,
-            'xgb_model': self.xgb_model,
+            'lgb_model_file': os.path.basename(lgb_path),
+            'xgb_model_file': os.path.basename(xgb_path),
             'meta_learner': self.meta_learner,
             'location_encoder': self.location_encoder,
             'crime_encoder': self.crime_encoder,
-            'scaler': self.scaler,
             'feature_names': self.feature_names,
             'trained_at': datetime.now().isoformat(),
             'metrics': {
@@ -284,11 +391,11 @@ class EnsembleHotspotPredictor:
                 'ensemble_accuracy': ensemble_acc
             }
         }
-        joblib.dump(ensemble_data, ensemble_path)
+        joblib.dump(ensemble_data, ensemble_path, compress=MODEL_COMPRESSION,
+                    protocol=pickle.HIGHEST_PROTOCOL)
         
         print(f"   ✅ LightGBM model: {lgb_path}")
         print(f"   ✅ XGBoost model: {xgb_path}")
-        print(f"   ✅ Meta-learner: {meta_path}")
         print(f"   ✅ Complete ensemble: {ensemble_path}")
         
         self.is_trained = True
@@ -302,12 +409,21 @@ class EnsembleHotspotPredictor:
     def load(self, ensemble_path: str):
         """Load a trained ensemble model."""
         data = joblib.load(ensemble_path)
-        self.lgb_model = data['lgb_model']
-        self.xgb_model = data['xgb_model']
+        # prepare_features always builds the current layout, so a bundle
+        # trained on another one cannot be served
+        if data.get('feature_names') != FEATURE_COLUMNS or 'lgb_model_file' not in data:
+            raise ValueError(
+                f"Ensemble at {ensemble_path} was trained on an older feature layout; "
+                "retrain required (run train_ensemble_model.py)."
+            )
+        model_dir = os.path.dirname(ensemble_path)
+        self._lgb_booster = lgb.Booster(model_file=os.path.join(model_dir, data['lgb_model_file']))
+        self._xgb_booster = xgb.Booster()
+        self._xgb_booster.load_model(os.path.join(model_dir, data['xgb_model_file']))
+        self._xgb_booster.set_param({'nthread': XGB_N_JOBS})
         self.meta_learner = data['meta_learner']
         self.location_encoder = data['location_encoder']
         self.crime_encoder = data['crime_encoder']
-        self.scaler = data['scaler']
         self.feature_names = data['feature_names']
         self.is_trained = True
         print(f"✅ Loaded ensemble model (trained at: {data['trained_at']})")
@@ -319,10 +435,11 @@ class EnsembleHotspotPredictor:
         if not self.is_trained:
             raise ValueError("Model not trained. Call train() or load() first.")
         
-        X_scaled = self.scaler.transform(X)
+        X = np.asarray(X, dtype=np.float32)
         
-        lgb_pred = self.lgb_model.predict_proba(X_scaled)[:, 1]
-        xgb_pred = self.xgb_model.predict_proba(X_scaled)[:, 1]
+        # Binary boosters return the positive-class probability directly
+        lgb_pred = self._lgb_booster.predict(X, num_threads=N_JOBS)
+        xgb_pred = self._xgb_booster.inplace_predict(X)
         meta_features = np.column_stack([lgb_pred, xgb_pred])
         
         return self.meta_learner.predict_proba(meta_features)[:, 1]
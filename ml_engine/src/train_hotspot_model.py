@@ -24,6 +24,19 @@ from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, roc_auc_score
 
+from ml_common import (
+    CSV_ENGINE, N_JOBS, LGBM_HISTOGRAM_PARAMS,
+    HOUR_SIN, HOUR_COS, DOW_SIN, DOW_COS, MONTH_SIN, MONTH_COS
+)
+
+# Explicit training CSV dtypes so the parser skips type inference
+CSV_DTYPES = {
+    "ward_id": "category", "ward_name": "category", "crime_type": "category",
+    "latitude": "float64", "longitude": "float64", "ward_risk_weight": "float64",
+    "hour": "int8", "day_of_week": "int8", "month": "int8", "year": "int16",
+    "is_weekend": "int8", "is_night": "int8",
+}
+
 # Mumbai Wards Reference
 MUMBAI_WARDS = {
     "G/N": {"name": "Dharavi-Mahim-Dadar", "lat": 19.0419, "lng": 72.8478, "risk_weight": 1.8},
@@ -53,6 +66,11 @@ MUMBAI_WARDS = {
 }
 
 
+# Ward metadata as aligned arrays for batched prediction
+_WARD_IDS = list(MUMBAI_WARDS.keys())
+_WARD_RISK = np.array([info["risk_weight"] for info in MUMBAI_WARDS.values()])
+
+
 class HotspotPredictor:
     """Crime Hotspot Prediction using LightGBM or GradientBoosting."""
     
@@ -61,7 +79,8 @@ class HotspotPredictor:
         self.ward_encoder = LabelEncoder()
         self.crime_encoder = LabelEncoder()
         self.feature_names = []
-        self.ward_stats = {}
+        self.ward_stats = pd.DataFrame(columns=["mean", "std"])
+        self._X_buf = None
         
     def prepare_features(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
         """Prepare features for training/prediction."""
@@ -72,34 +91,36 @@ class HotspotPredictor:
         df["crime_encoded"] = self.crime_encoder.fit_transform(df["crime_type"])
         
         # Cyclical encoding for hour
-        df["hour_sin"] = np.sin(2 * np.pi * df["hour"] / 24)
-        df["hour_cos"] = np.cos(2 * np.pi * df["hour"] / 24)
+        hour = df["hour"].to_numpy(dtype=np.intp)
+        df["hour_sin"] = HOUR_SIN[hour]
+        df["hour_cos"] = HOUR_COS[hour]
         
         # Cyclical encoding for day of week
-        df["dow_sin"] = np.sin(2 * np.pi * df["day_of_week"] / 7)
-        df["dow_cos"] = np.cos(2 * np.pi * df["day_of_week"] / 7)
+        dow = df["day_of_week"].to_numpy(dtype=np.intp)
+        df["dow_sin"] = DOW_SIN[dow]
+        df["dow_cos"] = DOW_COS[dow]
         
         # Cyclical encoding for month
-        df["month_sin"] = np.sin(2 * np.pi * df["month"] / 12)
-        df["month_cos"] = np.cos(2 * np.pi * df["month"] / 12)
+        month = df["month"].to_numpy(dtype=np.intp)
+        df["month_sin"] = MONTH_SIN[month]
+        df["month_cos"] = MONTH_COS[month]
         
         # Calculate crime counts per ward per time window
         df["date"] = pd.to_datetime(df["timestamp"]).dt.date
-        ward_hour_counts = df.groupby(["ward_id", "hour", "date"]).size().reset_index(name="crime_count")
+        ward_hour_counts = df.groupby(["ward_id", "hour", "date"], observed=True).size().reset_index(name="crime_count")
         
         # Merge back
         df = df.merge(ward_hour_counts, on=["ward_id", "hour", "date"], how="left")
         df["crime_count"] = df["crime_count"].fillna(0)
         
         # Create hotspot label (above mean + 1std)
-        self.ward_stats = df.groupby("ward_id")["crime_count"].agg(["mean", "std"]).to_dict()
+        ward_counts = df.groupby("ward_id", observed=True)["crime_count"]
+        self.ward_stats = ward_counts.agg(["mean", "std"])
         
-        def is_hotspot(row):
-            ward = row["ward_id"]
-            threshold = self.ward_stats["mean"].get(ward, 1) + self.ward_stats["std"].get(ward, 0.5)
-            return 1 if row["crime_count"] >= max(threshold, 2) else 0
-        
-        df["is_hotspot"] = df.apply(is_hotspot, axis=1)
+        ward_mean = ward_counts.transform("mean").to_numpy()
+        ward_std = ward_counts.transform("std").fillna(0.5).to_numpy()
+        threshold = np.maximum(ward_mean + ward_std, 2)
+        df["is_hotspot"] = (df["crime_count"].to_numpy() >= threshold).astype(np.int8)
         
         # Feature columns
         self.feature_names = [
@@ -116,7 +137,7 @@ class HotspotPredictor:
         """Train the hotspot prediction model."""
         
         print("Loading training data...")
-        df = pd.read_csv(data_path)
+        df = pd.read_csv(data_path, engine=CSV_ENGINE, dtype=CSV_DTYPES, parse_dates=["timestamp"])
         print(f"Loaded {len(df)} records")
         
         print("Preparing features...")
@@ -141,6 +162,8 @@ class HotspotPredictor:
                 learning_rate=0.05,
                 n_estimators=300,
                 feature_fraction=0.8,
+                **LGBM_HISTOGRAM_PARAMS,
+                n_jobs=N_JOBS,
                 random_state=42,
                 verbose=-1
             )
@@ -153,7 +176,12 @@ class HotspotPredictor:
                 random_state=42
             )
         
-        self.model.fit(X_train, y_train)
+        if LIGHTGBM_AVAILABLE:
+            # Split on ward identity as a category, not an ordinal
+            self.model.fit(X_train, y_train, categorical_feature=["ward_encoded"])
+        else:
+            self.model.fit(X_train, y_train)
+        self._X_buf = None  # encoders were refit; rebuild on next predict
         
         # Evaluate
         print("\n=== Model Evaluation ===")
@@ -196,8 +224,23 @@ class HotspotPredictor:
         self.crime_encoder = model_data["crime_encoder"]
         self.feature_names = model_data["feature_names"]
         self.ward_stats = model_data["ward_stats"]
+        self._build_ward_buffer()
         return self
     
+    def _build_ward_buffer(self):
+        """Preallocate the per-ward feature matrix and fill its ward columns."""
+        self._X_buf = np.zeros((len(_WARD_IDS), len(self.feature_names)))
+        self._X_buf[:, self.feature_names.index("ward_encoded")] = self._encode_wards()
+        self._X_buf[:, self.feature_names.index("ward_risk_weight")] = _WARD_RISK
+    
+    def _encode_wards(self) -> np.ndarray:
+        """Encode every ward id, using 0 for wards the encoder has not seen."""
+        known = np.isin(_WARD_IDS, self.ward_encoder.classes_)
+        encoded = np.zeros(len(_WARD_IDS), dtype=int)
+        if known.any():
+            encoded[known] = self.ward_encoder.transform(np.array(_WARD_IDS)[known])
+        return encoded
+    
     def predict_hotspots(self, hour: int = None, day_of_week: int = None) -> List[Dict]:
         """
         Predict hotspots for all wards at a given time.
@@ -211,42 +254,40 @@ class HotspotPredictor:
         day_of_week = day_of_week if day_of_week is not None else now.weekday()
         month = now.month
         
+        if self._X_buf is None:
+            self._build_ward_buffer()
+        
+        is_night = 1 if (hour >= 22 or hour <= 5) else 0
+        
+        # Ward columns are cached; only the time columns change per call
+        time_features = {
+            "hour_sin": HOUR_SIN[hour],
+            "hour_cos": HOUR_COS[hour],
+            "dow_sin": DOW_SIN[day_of_week],
+            "dow_cos": DOW_COS[day_of_week],
+            "month_sin": MONTH_SIN[month],
+            "month_cos": MONTH_COS[month],
+            "is_weekend": 1 if day_of_week >= 5 else 0,
+            "is_night": is_night,
+        }
+        for name, value in time_features.items():
+            self._X_buf[:, self.feature_names.index(name)] = value
+        X = pd.DataFrame(self._X_buf, columns=self.feature_names, copy=False)
+        
+        # Predict probability for all wards in one call
+        risk_scores = self.model.predict_proba(X)[:, 1]
+        
+        # Determine intensity level
+        intensities = np.select(
+            [risk_scores >= 0.7, risk_scores >= 0.5, risk_scores >= 0.3],
+            ["critical", "high", "medium"],
+            default="low"
+        )
+        
         predictions = []
         
-        for ward_id, ward_info in MUMBAI_WARDS.items():
-            # Create feature vector
-            try:
-                ward_encoded = self.ward_encoder.transform([ward_id])[0]
-            except:
-                ward_encoded = 0
-            
-            features = {
-                "ward_encoded": ward_encoded,
-                "hour_sin": np.sin(2 * np.pi * hour / 24),
-                "hour_cos": np.cos(2 * np.pi * hour / 24),
-                "dow_sin": np.sin(2 * np.pi * day_of_week / 7),
-                "dow_cos": np.cos(2 * np.pi * day_of_week / 7),
-                "month_sin": np.sin(2 * np.pi * month / 12),
-                "month_cos": np.cos(2 * np.pi * month / 12),
-                "is_weekend": 1 if day_of_week >= 5 else 0,
-                "is_night": 1 if (hour >= 22 or hour <= 5) else 0,
-                "ward_risk_weight": ward_info["risk_weight"]
-            }
-            
-            X = pd.DataFrame([features])[self.feature_names]
-            
-            # Predict probability
-            risk_score = self.model.predict_proba(X)[0, 1]
-            
-            # Determine intensity level
-            if risk_score >= 0.7:
-                intensity = "critical"
-            elif risk_score >= 0.5:
-                intensity = "high"
-            elif risk_score >= 0.3:
-                intensity = "medium"
-            else:
-                intensity = "low"
+        for i, ward_id in enumerate(_WARD_IDS):
+            ward_info = MUMBAI_WARDS[ward_id]
             
             # Create GeoJSON feature
             feature = {
@@ -258,11 +299,11 @@ class HotspotPredictor:
                 "properties": {
                     "ward_id": ward_id,
                     "ward_name": ward_info["name"],
-                    "risk_score": round(float(risk_score), 3),
-                    "intensity": intensity,
+                    "risk_score": round(float(risk_scores[i]), 3),
+                    "intensity": str(intensities[i]),
                     "hour": hour,
                     "day_of_week": day_of_week,
-                    "is_night": features["is_night"],
+                    "is_night": is_night,
                     "base_risk": ward_info["risk_weight"]
                 }
             }